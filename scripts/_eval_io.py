@@ -0,0 +1,193 @@
+"""Shared I/O helpers for the gen_car_eval*.py evaluation-set generators.
+
+Image reading/encoding, the Stanford Cars .mat annotation loader and the
+JSON writer live here so the three generators stay in sync. Import it as a
+sibling module (the scripts are run from the repo root as scripts/<name>.py).
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import pybase64  # pip install pybase64 (SIMD encoder)
+except ImportError:
+    pybase64 = base64
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# --format value -> case key holding the image payload. The Swift
+# VerifierEvaluationTests benchmark only reads "image_b64".
+IMAGE_KEYS = {"b64": "image_b64", "b85": "image_b85", "paths": "image_path"}
+
+
+def add_format_argument(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--format", choices=sorted(IMAGE_KEYS), default="b64",
+                    help="b64 (default), b85 (smaller) or paths (reference JPEGs on disk)")
+
+
+# ----------------- Annotations -----------------
+
+def load_annotations(devkit: Path) -> List[Dict]:
+    """Return list of {filename, description} using the devkit .mat files.
+
+    The parsed list is pickled to <devkit>/annotations.pkl and reused for as
+    long as it is newer than both .mat files. The cache is best effort: an
+    unreadable cache is re-parsed and an unwritable devkit is ignored.
+    """
+    meta_mat = devkit / "cars_meta.mat"
+    anno_mat = devkit / "cars_train_annos.mat"
+    cache = devkit / "annotations.pkl"
+    if not (meta_mat.exists() and anno_mat.exists()):
+        sys.exit("Annotation .mat files not found; check dataset path.")
+
+    newest = max(meta_mat.stat().st_mtime, anno_mat.stat().st_mtime)
+    if cache.exists() and cache.stat().st_mtime >= newest:
+        try:
+            with open(cache, "rb") as f:
+                return pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, OSError):
+            pass  # corrupt or truncated; rebuild below
+
+    records = _parse_annotations(meta_mat, anno_mat)
+    # Write via a temp file + os.replace so readers never see a partial pickle.
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    return records
+
+
+def _parse_annotations(meta_mat: Path, anno_mat: Path) -> List[Dict]:
+    import scipy.io as sio  # pip install scipy; only needed on a cold cache
+
+    meta = sio.loadmat(meta_mat, squeeze_me=True)
+    annos = sio.loadmat(anno_mat, squeeze_me=True)
+    class_names = meta["class_names"]  # array of strings
+
+    # cars_train_annos.mat has struct array with fields: bbox_x1, y1, x2, y2, class, fname
+    arr = annos["annotations"]
+    fnames = arr["fname"]
+    classes = arr["class"].astype(int)
+    descs = class_names[classes - 1]  # MATLAB is 1-indexed
+    return [{"filename": str(f), "description": str(d)} for f, d in zip(fnames, descs)]
+
+
+def list_images(root: Path) -> frozenset:
+    """Names of the .jpg files directly under *root*, from a single directory scan."""
+    if not root.is_dir():
+        return frozenset()
+    with os.scandir(root) as it:
+        return frozenset(e.name for e in it if e.name.endswith(".jpg"))
+
+
+# ----------------- Image payloads -----------------
+
+def read_file(path) -> bytes:
+    """Read a whole file in one syscall, hinting sequential read-ahead on Linux."""
+    if not hasattr(os, "posix_fadvise"):
+        return Path(path).read_bytes()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+
+
+def prefetch(paths: Iterable) -> None:
+    """Queue kernel read-ahead for every file up front (no-op off Linux).
+
+    POSIX_FADV_WILLNEED starts the reads asynchronously, so the whole batch is
+    in flight before the pool workers block on their first read.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue  # best effort; read errors surface in the worker
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def encode_image(path, fmt: str = "b64") -> str:
+    """Return the payload for *path*: base64/base85 JPEG bytes or a repo-relative path."""
+    if fmt == "paths":
+        return str(Path(path).relative_to(REPO_ROOT))
+    data = read_file(path)
+    if fmt == "b85":
+        return base64.b85encode(data).decode()
+    return pybase64.b64encode(data).decode()
+
+
+def encode_images(paths: List, fmt: str = "b64") -> Iterator[str]:
+    """Yield payloads for *paths*, in order.
+
+    Reading + encoding dominates runtime and is independent per image, so it
+    is spread over a process pool. At most two payloads per worker are in
+    flight, so memory stays bounded when the caller writes each one out
+    before asking for the next. "paths" reads nothing and runs inline.
+    """
+    if fmt == "paths":
+        for p in paths:
+            yield encode_image(p, fmt)
+        return
+    prefetch(paths)
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for p in paths:
+            pending.append(ex.submit(encode_image, p, fmt))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def with_payloads(cases: Iterable[Dict], payloads: Iterable[str], fmt: str) -> Iterator[Dict]:
+    """Yield each case with its payload added as the first key, IMAGE_KEYS[fmt]."""
+    key = IMAGE_KEYS[fmt]
+    # payloads first: zip then drains it, letting the pool/cache generator finish.
+    for payload, case in zip(payloads, cases):
+        yield {key: payload, **case}
+
+
+# ----------------- Output -----------------
+
+def write_cases(path: Path, cases: Iterable[Dict]) -> int:
+    """Stream *cases* to *path* as a JSON array, one compact record per line.
+
+    Pass a generator (see with_payloads) and each multi-MB case is encoded,
+    written and dropped before the next is produced, so peak memory is about
+    one payload per pool slot rather than the whole dataset. ``json.dumps``
+    also takes the C encoder, unlike ``json.dump(..., indent=2)``.
+    Returns the number of cases written.
+    """
+    n = 0
+    with open(path, "w", buffering=1 << 20) as f:
+        f.write("[\n")
+        for case in cases:
+            if n:
+                f.write(",\n")
+            f.write(json.dumps(case))
+            n += 1
+        f.write("\n]\n")
+    return n
@@ -4,15 +4,27 @@
 The HTML contains each make as a collapsible list (<li><div><b>MAKE</b> ...).
 We fetch the page (requires an Accept header), extract bold tags inside the
 #vehicles section, deduplicate, sort, and write datasets/uber_eligible.json.
+Parsing uses selectolax when installed and falls back to regexes otherwise.
 
 Run:
     python scripts/build_uber_allow.py --city boston
 """
 from __future__ import annotations
 import argparse, json, re, sys
+from html import unescape
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # pip install selectolax
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser  # selectolax < 1.0 (Modest backend)
+    except ImportError:
+        HTMLParser = None
 
 ROOT = Path(__file__).resolve().parent.parent
 OUTPUT = ROOT / "datasets" / "uber_eligible.json"
@@ -21,31 +33,61 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
 }
 
+# Keep-alive session so retries reuse the TLS connection.
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+    raise_on_status=False,  # let fetch() report the final status code
+)))
+
+_SECTION_RE = re.compile(r"<section[^>]+id=\"vehicles\"[\s\S]*?</section>", re.I)
+_BOLD_RE = re.compile(r"<b[^>]*>(.*?)</b>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_YEAR_RE = re.compile(r"\d{4}")
+
 
 def fetch(city: str) -> str:
     url = f"https://www.uber.com/global/en/eligible-vehicles/?city={city}"
-    r = requests.get(url, headers=HEADERS, timeout=20)
+    r = _SESSION.get(url, timeout=20)
     if r.status_code != 200:
         sys.exit(f"Failed to fetch {url}: {r.status_code}")
     return r.text
 
 
 def parse_makes(html: str) -> list[str]:
-    # crude regex to extract text inside <b>..</b> tags within vehicles section.
-    section_match = re.search(r"<section[^>]+id=\"vehicles\"[\s\S]*?</section>", html, re.I)
-    if section_match:
-        html = section_match.group(0)
-    texts = re.findall(r"<b[^>]*>(.*?)</b>", html, re.I | re.S)
+    if HTMLParser is not None:
+        texts = _bold_texts_selectolax(html)
+    else:
+        texts = _bold_texts_regex(html)
     makes = set()
-    for t in texts:
-        txt = re.sub(r"<[^>]+>", "", t).strip()  # remove nested tags
-        if txt and len(txt) > 2 and not re.search(r"\d{4}", txt):
+    for txt in texts:
+        if txt and len(txt) > 2 and not _YEAR_RE.search(txt):
             makes.add(txt)
     return sorted(makes)
 
 
+# Both extractors separate nested tags with a space, decode entities and
+# collapse whitespace (incl. &nbsp;) so the output doesn't depend on which
+# one ran.
+
+def _bold_texts_selectolax(html: str) -> list[str]:
+    tree = HTMLParser(html)
+    nodes = tree.css("section#vehicles b") or tree.css("b")
+    return [" ".join(n.text(separator=" ").split()) for n in nodes]
+
+
+def _bold_texts_regex(html: str) -> list[str]:
+    # crude regex to extract text inside <b>..</b> tags within vehicles section.
+    section_match = _SECTION_RE.search(html)
+    if section_match:
+        html = section_match.group(0)
+    return [" ".join(unescape(_TAG_RE.sub(" ", t)).split()) for t in _BOLD_RE.findall(html)]
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--city", default="boston", help="city param for Uber URL")
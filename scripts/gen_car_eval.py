@@ -9,69 +9,166 @@ Prereqs: datasets/stanford_cars should contain sub-folders named like
 `2012_Toyota_Prius/` filled with .jpg images (as provided by the
 Stanford Cars tarballs).
 """
-import base64
-import json
+import argparse
 import os
 import random
+import re
+import sqlite3
 import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List
 
 import scipy.io as sio
 
+from _eval_io import add_format_argument, encode_images, with_payloads, write_cases
+
 # Paths relative to repo root
 REPO_ROOT = Path(__file__).resolve().parent.parent
 ROOT = REPO_ROOT / "datasets" / "stanford_cars"
 OUTPUT = REPO_ROOT / "datasets" / "car_eval.json"
+CACHE_DB = REPO_ROOT / ".cache" / "b64_cache.sqlite"
 SAMPLE_SIZE = 250  # adjust as needed
 
 random.seed(42)
 
+_SPLIT_RE = re.compile(r"[ _]")
+
 def make_description(folder_name: str) -> str:
     """Create a human-readable description from folder like '2012_Toyota_Prius'."""
-    parts = re.split(r"[ _]", folder_name)
+    parts = _SPLIT_RE.split(folder_name)
     if len(parts) < 3:
         return folder_name  # fallback
     year, make = parts[0], parts[1]
     model = " ".join(parts[2:])
     return f"{make} {model} ({year})"
 
-def encode_image(path: str) -> str:
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+def iter_jpgs(root: Path) -> Iterator[str]:
+    """Yield every .jpg under *root* using os.scandir (no per-entry stat on Linux).
+
+    Hidden entries are skipped and symlinked folders are followed, matching
+    glob's default behaviour; each real directory is scanned once, so a
+    symlink loop cannot recurse forever.
+    """
+    stack = [str(root)]
+    seen = {os.path.realpath(root)}
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    real = os.path.realpath(entry.path)
+                    if real not in seen:
+                        seen.add(real)
+                        stack.append(entry.path)
+                elif entry.name.endswith(".jpg"):
+                    yield entry.path
+
+def reservoir_sample(items: Iterable[str], k: int) -> List[str]:
+    """Uniform k-of-n sample in one pass with O(k) memory (Algorithm R)."""
+    sample: List[str] = []
+    for i, item in enumerate(items):
+        if i < k:
+            sample.append(item)
+        else:
+            j = random.randint(0, i)
+            if j < k:
+                sample[j] = item
+    return sample
+
+def open_cache(path: Path = CACHE_DB) -> sqlite3.Connection:
+    """Open the encoded-image cache: one row per (path, format), tagged with size/mtime."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS encoded ("
+        "path TEXT, fmt TEXT, size INTEGER, mtime_ns INTEGER, payload TEXT, "
+        "PRIMARY KEY (path, fmt))"
+    )
+    return conn
+
+def cache_lookup(conn: sqlite3.Connection, img: str, st: os.stat_result, fmt: str):
+    """Return the cached payload if *img* is unchanged since it was stored, else None."""
+    row = conn.execute(
+        "SELECT payload FROM encoded WHERE path=? AND fmt=? AND size=? AND mtime_ns=?",
+        (img, fmt, st.st_size, st.st_mtime_ns),
+    ).fetchone()
+    return row[0] if row else None
+
+def cache_contains(conn: sqlite3.Connection, img: str, st: os.stat_result, fmt: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM encoded WHERE path=? AND fmt=? AND size=? AND mtime_ns=?",
+        (img, fmt, st.st_size, st.st_mtime_ns),
+    ).fetchone() is not None
+
+def cache_store(conn: sqlite3.Connection, img: str, st: os.stat_result, fmt: str, payload: str) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO encoded VALUES (?, ?, ?, ?, ?)",
+        (img, fmt, st.st_size, st.st_mtime_ns, payload),
+    )
+
+def cached_payloads(paths: List[str], fmt: str) -> Iterator[str]:
+    """Yield payloads for *paths* in order; unchanged files (same size + mtime)
+    reuse their payload from previous runs and only the rest are encoded."""
+    if fmt == "paths":
+        yield from encode_images(paths, fmt)
+        return
+    cache = open_cache()
+    try:
+        stats = {img: os.stat(img) for img in paths}
+        misses = [img for img in paths if not cache_contains(cache, img, stats[img], fmt)]
+        print(f"Encoding {len(misses)} images ({len(paths) - len(misses)} from cache)")
+        encoded = encode_images(misses, fmt)
+        missed = set(misses)
+        for img in paths:
+            if img in missed:
+                payload = next(encoded)
+                cache_store(cache, img, stats[img], fmt, payload)
+            else:
+                payload = cache_lookup(cache, img, stats[img], fmt)
+            yield payload
+    finally:
+        cache.commit()  # rows stored so far are valid even if the run stops early
+        cache.close()
 
 def main() -> None:
+    ap = argparse.ArgumentParser()
+    add_format_argument(ap)
+    args = ap.parse_args()
+
     if not ROOT.exists():
         sys.exit(f"Dataset folder not found: {ROOT}\nDownload Stanford Cars first.")
 
-    images: List[str] = glob.glob(str(ROOT / "**/*.jpg"), recursive=True)
-    if len(images) == 0:
+    # Stream the listing straight into the sample instead of materialising it.
+    sample = reservoir_sample(iter_jpgs(ROOT), SAMPLE_SIZE)
+    if len(sample) == 0:
         sys.exit("No images found under stanford_cars directory.")
+    random.shuffle(sample)  # reservoir keeps listing order; negatives below take the first half
 
-    sample = random.sample(images, min(SAMPLE_SIZE, len(images)))
-    cases: List[Dict] = []
-    for img in sample:
-        folder = Path(img).parent.name
-        cases.append({
-            "image_b64": encode_image(img),
-            "target_description": make_description(folder),
-            "ground_truth_match": True,
-        })
+    # Fix descriptions, negatives and order before reading any image so the
+    # payloads can stream straight from the encoder (or cache) to disk.
+    plan = [
+        (img, {"target_description": make_description(Path(img).parent.name),
+               "ground_truth_match": True})
+        for img in sample
+    ]
 
     # Make ~50% negatives by shuffling descriptions
-    shuffled_desc = [c["target_description"] for c in cases]
+    shuffled_desc = [c["target_description"] for _, c in plan]
     random.shuffle(shuffled_desc)
-    for idx in range(len(cases) // 2):
-        cases[idx]["target_description"] = shuffled_desc[idx]
-        cases[idx]["ground_truth_match"] = False
+    for idx in range(len(plan) // 2):
+        plan[idx][1]["target_description"] = shuffled_desc[idx]
+        plan[idx][1]["ground_truth_match"] = False
 
-    random.shuffle(cases)
+    random.shuffle(plan)
+    payloads = cached_payloads([img for img, _ in plan], args.format)
     OUTPUT.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT, "w") as f:
-        json.dump(cases, f, indent=2)
+    n = write_cases(OUTPUT, with_payloads((c for _, c in plan), payloads, args.format))
 
     print(
-        f"Wrote {OUTPUT} with {len(cases)} cases (positives: {len(cases)//2}, negatives: {len(cases)//2})"
+        f"Wrote {OUTPUT} with {n} cases (positives: {n//2}, negatives: {n//2})"
     )
 
 if __name__ == "__main__":
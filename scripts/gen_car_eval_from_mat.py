@@ -15,14 +15,15 @@ Run with:
 """
 from __future__ import annotations
 
-import base64
-import json
+import argparse
 import random
 import sys
 from pathlib import Path
-from typing import List, Dict
 
-import scipy.io as sio  # pip install scipy
+from _eval_io import (
+    add_format_argument, encode_images, list_images, load_annotations, with_payloads,
+    write_cases,
+)
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 DEVKIT = REPO_ROOT / "datasets" / "archive (1)" / "car_devkit" / "devkit"
@@ -32,63 +33,41 @@ SAMPLE_SIZE = 250
 random.seed(42)
 
 
-def load_annotations() -> List[Dict]:
-    """Return list of {filename, description} using .mat files."""
-    meta_mat = DEVKIT / "cars_meta.mat"
-    anno_mat = DEVKIT / "cars_train_annos.mat"
-    if not (meta_mat.exists() and anno_mat.exists()):
-        sys.exit("Annotation .mat files not found; check dataset path.")
-
-    meta = sio.loadmat(meta_mat, squeeze_me=True)
-    annos = sio.loadmat(anno_mat, squeeze_me=True)
-    class_names = meta["class_names"]  # array of strings
-
-    # cars_train_annos.mat has struct array with fields: bbox_x1, y1, x2, y2, class, fname
-    records = []
-    for rec in annos["annotations"]:
-        fname = rec["fname"].item() if isinstance(rec["fname"], list) else rec["fname"]
-        cls_idx = int(rec["class"])
-        desc = class_names[cls_idx - 1]  # MATLAB is 1-indexed
-        records.append({"filename": fname, "description": desc})
-    return records
-
-
-def encode_image(path: Path) -> str:
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
-
-
 def main() -> None:
-    records = load_annotations()
+    ap = argparse.ArgumentParser()
+    add_format_argument(ap)
+    args = ap.parse_args()
+
+    records = load_annotations(DEVKIT)
     if len(records) == 0:
         sys.exit("No records parsed from annotations.")
 
     sample = random.sample(records, min(SAMPLE_SIZE, len(records)))
-    cases: List[Dict] = []
-    for rec in sample:
-        img_path = IMAGES_ROOT / rec["filename"]
-        if not img_path.exists():
-            # fallback: skip if image missing
-            continue
-        cases.append({
-            "image_b64": encode_image(img_path),
-            "target_description": rec["description"],
-            "ground_truth_match": True,
-        })
+    # fallback: skip records whose image is missing (one scandir, not a stat per record)
+    available = list_images(IMAGES_ROOT)
+    sample = [rec for rec in sample if rec["filename"] in available]
+
+    # Fix descriptions, negatives and order before reading any image so the
+    # payloads can stream straight from the encoder to disk.
+    plan = [
+        (IMAGES_ROOT / rec["filename"],
+         {"target_description": rec["description"], "ground_truth_match": True})
+        for rec in sample
+    ]
 
     # Introduce mismatches to create negatives
-    shuffled_desc = [c["target_description"] for c in cases]
+    shuffled_desc = [c["target_description"] for _, c in plan]
     random.shuffle(shuffled_desc)
-    for i in range(len(cases) // 2):
-        cases[i]["target_description"] = shuffled_desc[i]
-        cases[i]["ground_truth_match"] = False
+    for i in range(len(plan) // 2):
+        plan[i][1]["target_description"] = shuffled_desc[i]
+        plan[i][1]["ground_truth_match"] = False
 
-    random.shuffle(cases)
+    random.shuffle(plan)
+    payloads = encode_images([p for p, _ in plan], args.format)
     OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_JSON, "w") as f:
-        json.dump(cases, f, indent=2)
-    print(f"Wrote {OUTPUT_JSON} with {len(cases)} cases ("+
-          f"positives: {len(cases)//2}, negatives: {len(cases)//2})")
+    n = write_cases(OUTPUT_JSON, with_payloads((c for _, c in plan), payloads, args.format))
+    print(f"Wrote {OUTPUT_JSON} with {n} cases ("+
+          f"positives: {n//2}, negatives: {n//2})")
 
 
 if __name__ == "__main__":
@@ -19,14 +19,21 @@ Run:
 from __future__ import annotations
 
 import argparse
-import base64
 import json
 import random
 import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import List
 
-import scipy.io as sio  # pip install scipy
+from _eval_io import (
+    add_format_argument, encode_images, list_images, load_annotations, with_payloads,
+    write_cases,
+)
+
+try:
+    import ahocorasick  # pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 DEVKIT = REPO_ROOT / "datasets" / "archive (1)" / "car_devkit" / "devkit"
@@ -36,81 +43,77 @@ random.seed(42)
 
 
 def load_allowlist(path: Path):
+    """Return {make: model matcher or None}; None allows every model of that make."""
     with open(path) as f:
         data = json.load(f)
     if isinstance(data, list):
         return {m.lower(): None for m in data}
     elif isinstance(data, dict):
-        return {k.lower(): [s.lower() for s in v] for k, v in data.items()}
+        return {k.lower(): _build_matcher([s.lower() for s in v]) for k, v in data.items()}
     else:
         sys.exit("Allow-list must be a JSON list or dict.")
 
 
-def load_annotations() -> List[Dict]:
-    meta_mat = DEVKIT / "cars_meta.mat"
-    anno_mat = DEVKIT / "cars_train_annos.mat"
-    if not (meta_mat.exists() and anno_mat.exists()):
-        sys.exit("Annotation .mat files not found; check dataset path.")
-
-    meta = sio.loadmat(meta_mat, squeeze_me=True)
-    annos = sio.loadmat(anno_mat, squeeze_me=True)
-    class_names = meta["class_names"]
-
-    records = []
-    for rec in annos["annotations"]:
-        fname = rec["fname"].item() if isinstance(rec["fname"], list) else rec["fname"]
-        cls_idx = int(rec["class"])
-        desc = class_names[cls_idx - 1]
-        records.append({"filename": fname, "description": desc})
-    return records
+def _build_matcher(substrings: List[str]):
+    """Compile model substrings into one Aho-Corasick automaton (or keep the list)."""
+    if not substrings or "" in substrings:
+        return None  # nothing to filter on / empty substring matches everything
+    if ahocorasick is None:
+        return substrings
+    aut = ahocorasick.Automaton()
+    for sub in substrings:
+        aut.add_word(sub, sub)
+    aut.make_automaton()
+    return aut
 
 
-def encode_image(path: Path) -> str:
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+def _has_substring(matcher, text: str) -> bool:
+    if ahocorasick is None:
+        return any(sub in text for sub in matcher)
+    # Single O(len(text)) pass regardless of how many substrings were added.
+    return next(matcher.iter(text), None) is not None
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--allow", required=True, help="Path to uber_eligible.json allow-list")
     ap.add_argument("--sample", type=int, default=400, help="Number of examples to sample")
+    add_format_argument(ap)
     args = ap.parse_args()
 
     allow_map = load_allowlist(Path(args.allow))
 
-    recs = load_annotations()
+    recs = load_annotations(DEVKIT)
     filtered = []
     for r in recs:
-        make, _, model = r["description"].partition(" ")
-        mk_lc = make.lower()
+        desc_lc = r["description"].lower()
+        mk_lc, _, model = desc_lc.partition(" ")
         if mk_lc not in allow_map:
             continue
-        allowed_models = allow_map[mk_lc]
-        if allowed_models:
-            # require any allowed substring present (case-insensitive)
-            if not any(sub in r["description"].lower() for sub in allowed_models):
-                continue
+        matcher = allow_map[mk_lc]
+        # require any allowed substring present (case-insensitive)
+        if matcher is not None and not _has_substring(matcher, desc_lc):
+            continue
         filtered.append(r)
 
     print(f"Filtered {len(filtered)} / {len(recs)} annotations to Uber-eligible makes/models")
 
     sample = random.sample(filtered, min(args.sample, len(filtered)))
-    cases: List[Dict] = []
-    for rec in sample:
-        img_path = IMAGES_ROOT / rec["filename"]
-        if not img_path.exists():
-            continue
-        cases.append({
-            "image_b64": encode_image(img_path),
-            "target_description": rec["description"],
-            "ground_truth_match": True,
-        })
-
-    random.shuffle(cases)
+    # fallback: skip records whose image is missing (one scandir, not a stat per record)
+    available = list_images(IMAGES_ROOT)
+    sample = [rec for rec in sample if rec["filename"] in available]
+
+    # Fix order before reading any image so payloads stream straight to disk.
+    plan = [
+        (IMAGES_ROOT / rec["filename"],
+         {"target_description": rec["description"], "ground_truth_match": True})
+        for rec in sample
+    ]
+    random.shuffle(plan)
+    payloads = encode_images([p for p, _ in plan], args.format)
     OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_JSON, "w") as f:
-        json.dump(cases, f, indent=2)
-    print(f"Wrote {OUTPUT_JSON} with {len(cases)} cases (all positives)")
+    n = write_cases(OUTPUT_JSON, with_payloads((c for _, c in plan), payloads, args.format))
+    print(f"Wrote {OUTPUT_JSON} with {n} cases (all positives)")
 
 
 if __name__ == "__main__":
@@ -11,13 +11,29 @@ The script prints:
   • overall make-match %, model-match %, colour-match %
   • average Jaccard similarity between model token sets
 
+The fuzzy model match uses rapidfuzz when installed, else difflib. Their
+scores differ slightly (see fuzzy_match), so model-match % can shift a
+little depending on which one is available; the report names the one used.
+
 Modify SYNONYMS, BODY_WORDS, etc. as you iterate.
 """
 from __future__ import annotations
 
-import csv, re, sys, glob, os, difflib, statistics
+import csv, sys, glob, os, difflib, statistics, string
 from pathlib import Path
 
+try:
+    import numpy as np  # pip install numpy pandas
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+try:
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio  # pip install rapidfuzz
+except ImportError:
+    _fuzz_ratio = None
+FUZZY_BACKEND = "rapidfuzz" if _fuzz_ratio is not None else "difflib"
+
 # ----------------- Configurable dictionaries -----------------
 BODY_WORDS = {
     "sedan","coupe","convertible","wagon","hatchback","suv","van","cab",
@@ -45,25 +61,45 @@ SYNONYMS: dict[str,str] = {
     "land":"land-rover",
     "rover":"land-rover",
 }
+# One dict probe per token instead of three set lookups. Kinds are bit flags
+# so a word in both COLOURS and BODY/TRIM_WORDS is captured as the colour
+# first and skipped after that, as with the separate set checks.
+_COLOUR, _SKIP = 1, 2
+_WORD_KIND: dict[str,int] = {
+    w: (_COLOUR if w in COLOURS else 0) | (_SKIP if w in BODY_WORDS or w in TRIM_WORDS else 0)
+    for w in COLOURS | BODY_WORDS | TRIM_WORDS
+}
 
 # ----------------- Normalisation helpers -----------------
 
+class _TokenTable(dict):
+    """str.translate table: keep [a-z0-9 ], map every other code point to a space."""
+    def __missing__(self, code: int) -> int:
+        return 0x20
+
+_TOKEN_TABLE = _TokenTable({ord(c): ord(c) for c in string.ascii_lowercase + string.digits + " "})
+
 def _tokenise(text: str) -> list[str]:
     """Lowercase, strip punctuation -> tokens."""
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9 ]", " ", text)
-    return text.split()
+    return text.lower().translate(_TOKEN_TABLE).split()
+
+def _tokenise_series(texts: pd.Series) -> pd.Series:
+    """Vectorised `_tokenise` over a whole column."""
+    return texts.str.lower().str.translate(_TOKEN_TABLE).str.split()
 
 def normalise(text: str):
-    tokens = _tokenise(text)
+    return _normalise_tokens(_tokenise(text))
+
+def _normalise_tokens(tokens: list[str]):
     tokens = [t for t in tokens if not (len(t) == 4 and t.isdigit())]  # remove years
     colour: str | None = None
     filtered: list[str] = []
     for t in tokens:
-        if t in COLOURS and colour is None:
+        kind = _WORD_KIND.get(t, 0)
+        if kind & _COLOUR and colour is None:
             colour = t
             continue
-        if t in BODY_WORDS or t in TRIM_WORDS:
+        if kind & _SKIP:
             continue
         filtered.append(t)
     if not filtered:
@@ -81,67 +117,101 @@ def jaccard(a: list[str], b: list[str]) -> float:
 def fuzzy_match(a: list[str], b: list[str], threshold: float = 0.8) -> bool:
     if not a or not b:
         return False
-    return difflib.SequenceMatcher(None, " ".join(a), " ".join(b)).ratio() >= threshold
+    sa, sb = " ".join(a), " ".join(b)
+    if _fuzz_ratio is not None:
+        # Normalised Indel (LCS-based) similarity, scaled 0-100. SequenceMatcher
+        # matches greedy longest blocks instead, so it can score lower, e.g.
+        # ('bdbdb', 'bbadb') is 0.6 in difflib but 80 here.
+        return _fuzz_ratio(sa, sb) >= threshold * 100
+    return difflib.SequenceMatcher(None, sa, sb).ratio() >= threshold
 
 # ----------------- CSV analysis -----------------
 
+def _bool_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """'true'/'false' string column -> bool array (missing column -> all False)."""
+    if name not in df:
+        return np.zeros(len(df), dtype=bool)
+    return df[name].str.lower().eq("true").to_numpy()
+
+def _load_pandas(csv_path: Path):
+    """Return (total, (tp, tn, fn, fp), gts, preds, raw_gts) using pandas/NumPy."""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    expected = _bool_column(df, "expected")
+    is_match = _bool_column(df, "is_match")
+    confusion = (
+        int(np.count_nonzero(expected & is_match)),
+        int(np.count_nonzero(~expected & ~is_match)),
+        int(np.count_nonzero(expected & ~is_match)),
+        int(np.count_nonzero(~expected & is_match)),
+    )
+    gts = _tokenise_series(df["ground_truth"]).map(_normalise_tokens)
+    preds = _tokenise_series(df["predicted"]).map(_normalise_tokens)
+    raw_gts = df["ground_truth"].str.lower()
+    return len(df), confusion, gts, preds, raw_gts
+
+def _load_csv(csv_path: Path):
+    """Zero-dependency `_load_pandas`: csv.reader + header indices, no per-row dict."""
+    with csv_path.open(newline="") as f:
+        reader = csv.reader(f)
+        idx = {name: i for i, name in enumerate(next(reader, []))}
+        rows = [row for row in reader if row]  # DictReader skipped blank lines too
+    gt_i, pred_i = idx["ground_truth"], idx["predicted"]
+    exp_i, match_i = idx.get("expected"), idx.get("is_match")
+
+    def field(row: list[str], i: int | None) -> str:
+        return row[i] if i is not None and i < len(row) else ""
+
+    def flag(row: list[str], i: int | None) -> bool:
+        return field(row, i).lower() == "true"
+
+    tp = tn = fn = fp = 0
+    for row in rows:
+        expected, is_match = flag(row, exp_i), flag(row, match_i)
+        if expected and is_match:
+            tp += 1
+        elif not expected and not is_match:
+            tn += 1
+        elif expected:
+            fn += 1
+        else:
+            fp += 1
+    gts = [normalise(field(row, gt_i)) for row in rows]
+    preds = [normalise(field(row, pred_i)) for row in rows]
+    raw_gts = [field(row, gt_i).lower() for row in rows]
+    return len(rows), (tp, tn, fn, fp), gts, preds, raw_gts
+
 def analyse(csv_path: Path):
-    total = 0
     make_match = 0
     model_match = 0
     both_match = 0
     colour_match = 0
     j_scores: list[float] = []
     substring_match = 0
-    
-    # For match analysis
-    true_pos = 0
-    false_pos = 0
-    true_neg = 0
-    false_neg = 0
-    
-    with csv_path.open() as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            total += 1
-            gt = normalise(row["ground_truth"])
-            pred = normalise(row["predicted"])
-            
-            # Get expected and predicted match status
-            expected = row.get("expected", "").lower() == 'true'
-            is_match = row.get("is_match", "").lower() == 'true'
-            
-            # Update confusion matrix
-            if expected and is_match:
-                true_pos += 1
-            elif not expected and not is_match:
-                true_neg += 1
-            elif expected and not is_match:
-                false_neg += 1
-            elif not expected and is_match:
-                false_pos += 1
-                
-            if not gt or not pred:
-                continue
-                
-            make_ok = gt[0] == pred[0]
-            model_ok = fuzzy_match(gt[1], pred[1])
-            
-            if make_ok:
-                make_match += 1
-            if model_ok:
-                model_match += 1
-            if make_ok and model_ok:
-                both_match += 1
-            if gt[2] and pred[2] and gt[2] == pred[2]:
-                colour_match += 1
-                
-            j_scores.append(jaccard(gt[1], pred[1]))
-            
-            # Simple substring heuristic
-            raw_gt = row["ground_truth"].lower()
-            if gt[0] in raw_gt and all(tok in raw_gt for tok in pred[1][:2]):
-                substring_match += 1
+
+    load = _load_pandas if pd is not None else _load_csv
+    total, (true_pos, true_neg, false_neg, false_pos), gts, preds, raw_gts = load(csv_path)
+
+    for gt, pred, raw_gt in zip(gts, preds, raw_gts):
+        if not gt or not pred:
+            continue
+
+        make_ok = gt[0] == pred[0]
+        model_ok = fuzzy_match(gt[1], pred[1])
+
+        if make_ok:
+            make_match += 1
+        if model_ok:
+            model_match += 1
+        if make_ok and model_ok:
+            both_match += 1
+        if gt[2] and pred[2] and gt[2] == pred[2]:
+            colour_match += 1
+
+        j_scores.append(jaccard(gt[1], pred[1]))
+
+        # Simple substring heuristic
+        if gt[0] in raw_gt and all(tok in raw_gt for tok in pred[1][:2]):
+            substring_match += 1
 
     # Calculate metrics
     precision = true_pos / (true_pos + false_pos) if (true_pos + false_pos) > 0 else 0
@@ -162,7 +232,7 @@ def analyse(csv_path: Path):
     
     print("\n--- Detailed Accuracy ---")
     print(f"Make accuracy: {make_match/total:.3%}")
-    print(f"Model (fuzzy) accuracy: {model_match/total:.3%}")
+    print(f"Model (fuzzy, {FUZZY_BACKEND}) accuracy: {model_match/total:.3%}")
     print(f"Make + Model accuracy: {both_match/total:.3%}")
     print(f"Colour accuracy (if present): {colour_match/total:.3%}")
     print(f"Average Jaccard(model tokens): {statistics.mean(j_scores):.3f}" if j_scores else "No valid Jaccard scores")